@@ -32,43 +32,40 @@ default_infopath = ':'.join((
 class IPath(PosixPath):
     """Represents entries in the infopath as well as info files."""
 
+    def _st(self) -> os.stat_result:
+        """Stat the path only once and reuse the result afterwards."""
+        s = self.__dict__.get('_s')
+        return s or self.__dict__.setdefault('_s', os.stat(self))
+
     def __eq__(self, other):
         """Equivalent to samefile."""
-        return self.samefile(other)
+        if not isinstance(other, IPath):
+            return self.samefile(other)
+        s, o = self._st(), other._st()
+        return s.st_ino == o.st_ino and s.st_dev == o.st_dev
 
     def __hash__(self):
         """Compare inode and device."""
-        return hash(self.stat().st_ino) ^ hash(self.stat().st_dev)
-
-    def __init__(self, onepath):
-        """Special initialization for child.
-
-        You should always read the source of whatever you're subclassing if the
-        parent resides in the standard library. This is because class design
-        (like everything else in python) is done in runtime while also being
-        quite meta; objects can be initialized via the __new__ method and may
-        not even have an __init__!
-
-        tl;dr Python throws an error without this.
-        """
-        super().__new__(PosixPath, onepath)
+        s = self._st()
+        return hash((s.st_ino, s.st_dev))
 
 
-infodirs: set[IPath] = set()
+# Directories that don't exist can't be hashed (or searched), so they're left
+# out along with the PATH placeholder.
 env = os.getenv('INFOPATH', default_infopath)
 env_list = env.split(':')
-try:
-    env_list.remove('PATH')
-except ValueError:
-    pass
-else:
-    suffixes = ['share/info', 'info']
-    sys_path = os.getenv('PATH')
-    if sys_path is not None:
-        IPaths = (IPath(p) for p in sys_path.split(':'))
-    for path in IPaths:
+infodirs: set[IPath] = {IPath(p) for p in env_list
+                        if p != 'PATH' and os.path.isdir(p)}
+if 'PATH' in env_list:
+    # Like GNU Info, look for info directories beside each directory in PATH,
+    # e.g. /usr/share/info for /usr/bin.
+    suffixes = ('share/info', 'info')
+    for p in os.getenv('PATH', '').split(':'):
+        p = p.rstrip('/')
+        if not p:
+            continue
+        prefix = os.path.dirname(p)
         for suffix in suffixes:
-            tpath = path.joinpath(suffix)
-            if tpath.is_dir():
-                infodirs.add(IPath(path))
-infodirs |= {IPath(p) for p in env.split(':')}
+            candidate = os.path.join(prefix, suffix)
+            if os.path.isdir(candidate):
+                infodirs.add(IPath(candidate))
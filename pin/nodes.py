@@ -5,46 +5,61 @@
 # have a look at Appendix F of the GNU Texinfo manual before reading.
 
 import abc
+import bz2
 import enum
+import gzip
+import heapq
+import lzma
+import mmap
 import os
+import stat
+import sys
 import typing
+import weakref
 from dataclasses import dataclass
 from pathlib import PosixPath
 from subprocess import run
-from itertools import islice
 
 import regex as re
 
 from pin import utils
 from pin import infopath
 
-INFO_COOKIE = '\037'
-INFO_FF = '\014'
+INFO_COOKIE = b'\037'
+INFO_FF = b'\014'
 NL_SEP = r',\s+'
 NL_C = '[^,\n]+'  # Contents
-NODE_RAW = ''.join((fr"^File:\s+(?P<filename>{NL_C}){NL_SEP}",
-                    fr"Node:\s+(?P<nodename>{NL_C})",
-                    fr"({NL_SEP}Next:\s+(?P<next>{NL_C}))?",
-                    fr"({NL_SEP}Prev(ious)?:\s+(?P<prev>{NL_C}))?",
-                    fr"({NL_SEP}Up:\s+(?P<up>{NL_C}))?$"))
-
-NODE_SEP = f"^{INFO_COOKIE}{INFO_FF}?\r?$"
-SEP_R = re.compile(NODE_SEP, re.MULTILINE | re.IGNORECASE)
-NODE_HEADER_R = re.compile(NODE_RAW, re.MULTILINE | re.IGNORECASE)
-
-TAG_TABLE_ENTRY = 'Node: (?P<name>[\\w ]+)\x7F(?P<num>\\d+)'
-TTE_R = re.compile(TAG_TABLE_ENTRY, re.IGNORECASE)
-
-# Non-empty line stripped of whitespace
-line_r = re.compile(r'^\s*(\S.*?)\s*$', re.MULTILINE)
+# Only the first letter of each label may change case, so spell that out
+# rather than paying for case folding on every character.
+NODE_RAW = ''.join((fr"^[Ff]ile:\s+(?P<filename>{NL_C}){NL_SEP}",
+                    fr"[Nn]ode:\s+(?P<nodename>{NL_C})",
+                    fr"({NL_SEP}[Nn]ext:\s+(?P<next>{NL_C}))?",
+                    fr"({NL_SEP}[Pp]rev(ious)?:\s+(?P<prev>{NL_C}))?",
+                    fr"({NL_SEP}[Uu]p:\s+(?P<up>{NL_C}))?$"))
+
+# The file itself is scanned as bytes, only the node headers are matched
+# against decoded text.
+NODE_SEP = b"^" + INFO_COOKIE + INFO_FF + b"?\r?$"
+SEP_R = re.compile(NODE_SEP, re.MULTILINE)
+NODE_HEADER_R = re.compile(NODE_RAW, re.MULTILINE)
+
+TAG_TABLE_ENTRY = rb'Node: (?P<name>[^\x7F\n]+)\x7F(?P<num>\d+)'
+TTE_R = re.compile(TAG_TABLE_ENTRY)
+
+_WS_R = re.compile(r'\s+')
 menu_item_r = re.compile(r'\((?P<file>\w+)\)(?P<node>\w+)')
 
+# Formats the standard library can decompress without leaving the process.
+decompressors = {
+        '.gz': gzip.open,
+        '.xz': lzma.open,
+        '.bz2': bz2.open
+}
+
+# Everything else has to go through an external program.
 compress_suffixes = {
-        '.gz': ['gzip', '-d'],
-        '.lz': ['lzip', '-d'],
-        '.xz': ['unxz'],
-        '.bz2': ['bunzip2'],
-        '.z': ['uncompress'],
+        '.lz': ['lzip', '-d', '-c'],
+        '.z': ['uncompress', '-c'],
         '.Y': ['unyabba']
 }
 
@@ -55,13 +70,21 @@ compress_suffixes = {
 class Labels(enum.Enum):
     """Labels for points of interest in an info file."""
     TABLE_BEG = 'Tag Table:'
-    TABLE_END = 'End Tag Table:'
+    TABLE_END = 'End Tag Table'
+    INDIRECT = '(Indirect)'
     MENU = '\n* Menu:'
     XREF = '*Note'
     MENU_ENTRY = '\n* '
 
 
-@dataclass
+# The buffer is scanned as bytes, so keep the labels we look for there ready
+# as bytes. Each one starts a line.
+_TABLE_BEG = b'\n' + Labels.TABLE_BEG.value.encode()
+_TABLE_END = b'\n' + Labels.TABLE_END.value.encode()
+_INDIRECT = b'\n' + Labels.INDIRECT.value.encode()
+
+
+@dataclass(slots=True)
 class Tag:
     """A pointer to a node in an info file.
 
@@ -79,7 +102,7 @@ class Tag:
     # cache: Node = None              # Saved information about pointed-to node
 
 
-@dataclass(init=False)
+@dataclass(init=False, slots=True)
 class Reference:
     """Structure which describes a node reference (possibly invalid)."""
 
@@ -100,63 +123,151 @@ class Reference:
         return hash(self.filename) ^ hash(self.nodename)
 
 
+def _find_sep(buf: bytes, start: int) -> int:
+    """Return the end of the first node separator line at or after start.
+
+    This is the same as SEP_R.search(buf, start).end(), but lets find do the
+    scanning for the cookie instead of the regex engine. Returns -1 if there
+    is no separator.
+    """
+    i = start
+    n = len(buf)
+    while True:
+        j = buf.find(INFO_COOKIE, i)
+        if j < 0:
+            return -1
+        if j == 0 or buf[j - 1] == 0x0a:
+            k = j + 1
+            if k < n and buf[k] == 0x0c:
+                k += 1
+            if k < n and buf[k] == 0x0d:
+                k += 1
+            if k == n or buf[k] == 0x0a:
+                return k
+        i = j + 1
+
+
+def _second_empty_line(text: str, start: int) -> int:
+    """Return the start of the second empty line after start.
+
+    An empty line begins right after the first newline of each '\\n\\n'.
+    The end of the text is returned if there aren't two of them.
+    """
+    first = text.find('\n\n', start)
+    if first >= 0:
+        second = text.find('\n\n', first + 1)
+        if second >= 0:
+            return second + 1
+    return len(text)
+
+
+# Directory listings of the infopath, filled in the first time a directory is
+# searched.
+_dir_index: typing.Dict[PosixPath, typing.Dict[str, os.DirEntry]] = {}
+
+
+def _index_directory(directory: PosixPath) -> typing.Dict[str, os.DirEntry]:
+    """Map the names an info file may be requested by to its entry.
+
+    Each entry is listed under its own name as well as without its compression
+    and '.info' suffixes, so that 'sample' finds 'sample.info.gz'.
+    """
+    index = _dir_index.get(directory)
+    if index is not None:
+        return index
+    index = _dir_index[directory] = {}
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return index
+    for e in entries:
+        name = e.name
+        index[name] = e
+        base, dot, suffix = name.rpartition('.')
+        if dot and ('.' + suffix in decompressors or
+                    '.' + suffix in compress_suffixes):
+            name = base
+            index.setdefault(name, e)
+        if name.endswith('.info'):
+            index.setdefault(name[:-len('.info')], e)
+    return index
+
+
 class InfoFile(infopath.IPath):
     """A path object for an info file."""
 
     @staticmethod
-    def _check_compressed(path: PosixPath) -> typing.Optional[PosixPath]:
-        """Check for compression suffixes to help validate an info file.
-
-        Returns successful on no extension as well.
-        """
-        if path.is_file():
-            return path
-        for suffix in compress_suffixes:
-            try_c = path.with_suffix(suffix)
-            if try_c.is_file():
-                return try_c
-        return None
+    def _is_file(path: typing.Union[str, PosixPath]) -> bool:
+        """Check for a regular file with a single stat call."""
+        try:
+            return stat.S_ISREG(os.stat(path).st_mode)
+        except OSError:
+            return False
 
     @staticmethod
-    def _check_info(path: PosixPath) -> PosixPath:
-        """Validate an info file."""
-        try_paths = iter((path.joinpath('index'),
-                         InfoFile._check_compressed(path),
-                         InfoFile._check_compressed(path.with_suffix(
-                             '.info'))))
-        for p in try_paths:
-            if p:
-                return p
+    def _check_info(directory: PosixPath, name: str) -> str:
+        """Validate an info file.
+
+        This is a lookup in the directory index followed by a type check on
+        the entry, which readdir usually answers without a stat.
+        """
+        entry = _index_directory(directory).get(name)
+        if entry is not None:
+            if entry.is_file():
+                return entry.path
+            index = os.path.join(entry.path, 'index')
+            if entry.is_dir() and InfoFile._is_file(index):
+                return index
         raise FileNotFoundError
 
-    def __init__(self, path: typing.Union[str, PosixPath]):
+    @classmethod
+    def _find(cls, path: typing.Union[str, PosixPath]) -> str:
+        """Return the file that path points to, searching the infopath."""
+        if cls._is_file(path):
+            return path
+        name = infopath.IPath(path).name
+        for d in infopath.infodirs:
+            try:
+                return cls._check_info(d, name)
+            except FileNotFoundError:
+                pass
+        raise FileNotFoundError(f"Cannot find info file {path}")
+
+    # Up to 3.11 path objects are built in __new__; from 3.12 on __init__
+    # builds them again from its own arguments. The file that was found has
+    # to be passed to whichever one does the work in place of the name we
+    # were given.
+    def __new__(cls, path: typing.Union[str, PosixPath]):
         """Find the file that path points to."""
+        found = cls._find(path)
+        self = super().__new__(cls, found)
         self._path = infopath.IPath(path)
+        self._found = found
+        return self
 
-        if self._path.is_file():
-            super().__init__(path)
-        else:
-            for d in infopath.infodirs:
-                try:
-                    super().__init__(InfoFile._check_info(d / self._path.name))
-                except TypeError:
-                    pass
-                else:
-                    self.is_compressed = bool(self.compression_suffix)
-                    return
-            raise FileNotFoundError(f"Cannot find info file {path}")
+    def __init__(self, path: typing.Union[str, PosixPath]):
+        if sys.version_info >= (3, 12):
+            super().__init__(self._found)
+        self.is_compressed = bool(self.compression_suffix)
+
+    def with_segments(self, *pathsegments):
+        """Make paths derived from this one, like its parent, plain IPaths.
+
+        Only used from 3.12 on; they aren't info files to look up again.
+        """
+        return infopath.IPath(*pathsegments)
 
     @property
     def compression_suffix(self):
         """Return suffix if it is of a proper compression type."""
-        if self.suffix in compress_suffixes:
+        if self.suffix in decompressors or self.suffix in compress_suffixes:
             return self.suffix
         return None
 
     @property
     def finfo(self) -> os.stat_result:
         """Return the stat of file."""
-        return self._path.stat()
+        return self.stat()
 
     @property
     def filesize(self):
@@ -164,6 +275,12 @@ class InfoFile(infopath.IPath):
         return self.finfo.st_size
 
 
+# Buffers that are still in use somewhere, by the device and inode of their
+# file.
+_BUFFER_CACHE: typing.MutableMapping[
+        typing.Tuple[int, int], 'FileBuffer'] = weakref.WeakValueDictionary()
+
+
 class FileBuffer:
     """Represent a loaded info file.
 
@@ -172,8 +289,9 @@ class FileBuffer:
     we can reload the file if it has been modified since last being loaded.
     :param filename: The filename used to find this file
     :param fullpath: The full pathname of this info file
-    :param contents: The contents of this particular file
+    :param contents: The raw bytes of this particular file (possibly mapped)
     :param tags: The tags table
+    :param finfo: The stat of the file when it was loaded
     """
 
     @dataclass
@@ -183,12 +301,20 @@ class FileBuffer:
 
     def _read_info_file(self):
         suffix = self._path.compression_suffix
-        if suffix:
-            self.contents = run(compress_suffixes[suffix] + [str(self._path)],
-                       check=True).stdout
-        else:
-            with open(self.fullpath, 'r') as f:
+        if suffix in decompressors:
+            with decompressors[suffix](self.fullpath, 'rb') as f:
                 self.contents = f.read()
+        elif suffix:
+            self.contents = run(compress_suffixes[suffix] + [self.fullpath],
+                                capture_output=True, check=True).stdout
+        else:
+            with open(self.fullpath, 'rb') as f:
+                # An empty file can't be mapped.
+                if os.fstat(f.fileno()).st_size == 0:
+                    self.contents = b''
+                else:
+                    self.contents = mmap.mmap(f.fileno(), 0,
+                                              prot=mmap.PROT_READ)
 
     @property
     def filename(self):
@@ -207,28 +333,50 @@ class FileBuffer:
         self.tags: typing.List[Tag] = []
         self.nodes = utils.DList()
         self._path = InfoFile(path)
+        self.finfo = self._path.finfo
 
         self._read_info_file()
         self._scan_tags_table()
         self._build_nodes()
 
+    @classmethod
+    def open(cls, path: typing.Union[str, PosixPath]) -> 'FileBuffer':
+        """Return the buffer for an info file, loading it only if needed.
+
+        Everyone opening the same file shares one buffer, unless the file has
+        been modified since that buffer was loaded.
+        """
+        info_file = InfoFile(path)
+        finfo = info_file.finfo
+        key = (finfo.st_dev, finfo.st_ino)
+        buf = _BUFFER_CACHE.get(key)
+        if buf is None or buf.finfo.st_mtime_ns != finfo.st_mtime_ns:
+            buf = _BUFFER_CACHE[key] = cls(info_file)
+        return buf
+
     def _scan_tags_table(self):
         """Build the nodes of the buffer by scaning for a tags table.
 
-        This is used for both direct and indirect tables.
+        Split manuals, whose tables are indirect, aren't supported yet and
+        are left without any tags.
         """
-        for sep in SEP_R.finditer(self.contents, len(self.contents)-1000):
-            table_iter = line_r.finditer(self.contents, sep.end())
-            label = next(table_iter)
-            if label.group(1) == Labels.TABLE_BEG.value:
-                for entry in table_iter:
-                    e = entry.group(1)
-                    m = TTE_R.fullmatch(e)
-                    if m is None:
-                        return
-                    new_tag = Tag(self.filename, m.group('name'))
-                    new_tag.nodestart = int(m.group('num'))
-                    self.tags.append(new_tag)
+        # The table is always at the end of the file, so search backwards for
+        # its labels; only the tail of the buffer ever gets touched.
+        start = self.contents.rfind(_TABLE_BEG)
+        if start < 0:
+            return
+        start += len(_TABLE_BEG)
+        # The offsets in an indirect table count through the subfiles of a
+        # split manual, which aren't read, not through this file.
+        if self.contents[start:start + len(_INDIRECT)] == _INDIRECT:
+            return
+        end = self.contents.rfind(_TABLE_END, start)
+        if end < 0:
+            end = len(self.contents)
+        for m in TTE_R.finditer(self.contents, start, end):
+            self.tags.append(Tag(self.filename,
+                                 m['name'].decode('utf-8', 'replace'),
+                                 nodestart=int(m['num'])))
 
     def _build_nodes(self):
         """Build the list of nodes from the tag table."""
@@ -239,11 +387,23 @@ class FileBuffer:
 class ReferenceHooks(enum.Enum):
     """Regular expressions that signify the beginning of a reference source."""
 
-    # INDEX must include the menu part, otherwise INDEX and MENU will both
-    # match and lastindex will give the wrong number.
+    # INDEX must include the menu part, otherwise the menu of an index would
+    # also be picked up as a MENU.
     INDEX = '\x00\x08\\[index\x00\x08\\]\\s*^\\* Menu:'
     MENU = r'^\* Menu:'
-    X_REF = r'\* Note:'
+    X_REF = r'\* [Nn]ote:'
+
+
+# The literal text that every match of a hook starts with, along with the
+# position of the hook in ReferenceHooks (counting from 1). Looking for these
+# with str.find is much cheaper than running the hooks over the whole node.
+_HOOK_NEEDLES = (
+        (1, '\x00\x08[index\x00\x08]'),
+        (2, '* Menu:'),
+        (3, '* Note:'),
+        (3, '* note:'),
+)
+_HOOK_R = (None, *(re.compile(h.value, re.MULTILINE) for h in ReferenceHooks))
 
 
 class ReferenceSource(abc.ABC):
@@ -257,15 +417,36 @@ class ReferenceSource(abc.ABC):
     def _regex(cls) -> re.Pattern:
         """Extract the contents (abstract)."""
 
+    @staticmethod
+    def _build_ref(m: re.Match) -> Reference:
+        """Make a reference out of a match of the source's regex."""
+        gd = m.groupdict()
+        ref = Reference()
+        ref.filename = gd.get('file', '')
+        ref.nodename = _WS_R.sub(' ', gd['name'])
+        ref.start = m.start('name')
+        ref.end = m.end('name')
+        return ref
+
+    @classmethod
+    def iter_refs(cls, din: str, pos: int = 0,
+                  endpos: typing.Optional[int] = None
+                  ) -> typing.Iterator[Reference]:
+        """Scan the contents using regex, yielding references as they match.
+
+        Only din[pos:endpos] is scanned, but without copying it, so the
+        positions of the references are those within din.
+        """
+        build_ref = cls._build_ref
+        for m in cls._regex().finditer(din, pos, endpos):
+            yield build_ref(m)
+
     def add_ref(self, ref_obj: typing.Union[re.Match, Reference], offset=0):
         """Add a reference to this source."""
         if isinstance(ref_obj, re.Match):
-            gd = ref_obj.groupdict()
-            ref = Reference()
-            ref.filename = gd.get('file', '')
-            ref.nodename = re.sub(r'[\t\s]+', ' ', gd['name'])
-            ref.start = ref_obj.start('name') + offset
-            ref.end = ref_obj.end('name') + offset
+            ref = self._build_ref(ref_obj)
+            ref.start += offset
+            ref.end += offset
         elif isinstance(ref_obj, Reference):
             ref = ref_obj
         else:
@@ -274,10 +455,7 @@ class ReferenceSource(abc.ABC):
 
     def __init__(self, din: str):
         """Scan the contents using regex."""
-        self.refs: typing.List[Reference] = []
-        self._matches = list(self._regex().finditer(din))
-        for m in self._matches:
-            self.add_ref(m)
+        self.refs: typing.List[Reference] = list(self.iter_refs(din))
 
     def __init_subclass__(cls):
         """Assign the abtract class property."""
@@ -311,22 +489,18 @@ class Index(ReferenceSource):
     def _regex(cls):
         return cls.__regex
 
-    def add_ref(self, ref_obj: typing.Union[re.Match, Reference], offset=0):
-        """Add a reference to this source with the line number."""
-        if isinstance(ref_obj, re.Match):
-            gd = ref_obj.groupdict()
-            ref = Reference()
-            ref.filename = gd.get('file', '')
-            ref.nodename = gd['name']
-            ref.label = gd['label']
-            ref.line_number = int(ref_obj['line'])
-            ref.start = ref_obj.start('name') + offset
-            ref.end = ref_obj.end('name') + offset
-        elif isinstance(ref_obj, Reference):
-            ref = ref_obj
-        else:
-            raise TypeError('m must be a match object or reference.')
-        self.refs.append(ref)
+    @staticmethod
+    def _build_ref(m: re.Match) -> Reference:
+        """Make a reference with the line number out of a match."""
+        gd = m.groupdict()
+        ref = Reference()
+        ref.filename = gd.get('file', '')
+        ref.nodename = gd['name']
+        ref.label = gd['label']
+        ref.line_number = int(m['line'])
+        ref.start = m.start('name')
+        ref.end = m.end('name')
+        return ref
 
 
 class XReference(ReferenceSource):
@@ -341,8 +515,7 @@ class XReference(ReferenceSource):
     # same groups in different ways like in this instance.
     _regex1 = f"(?P<name>{ref_id})::"
     _regex2 = f"(?P<label>{label}): {ref_id}[.,]"
-    __regex = re.compile(r'\*Note ' + '|'.join((_regex1, _regex2)),
-                         re.IGNORECASE)
+    __regex = re.compile(r'\*[Nn]ote ' + '|'.join((_regex1, _regex2)))
 
     @classmethod
     def _regex(cls):
@@ -350,11 +523,17 @@ class XReference(ReferenceSource):
         return cls.__regex
 
 
+# Reference sources in the order of ReferenceHooks, counting from 1.
+_SOURCES = (None, Index, Menu, XReference)
+_NEEDS_EMPTYLINE = (False, True, True, False)
+
+
 class Node:
     """Implement a node."""
 
-    hook = re.compile('|'.join(map(lambda x: '(' + x.value + ')',
-        ReferenceHooks.__members__.values())), re.IGNORECASE | re.MULTILINE)
+    # A manual can have thousands of nodes, so don't give each a __dict__.
+    __slots__ = ('file_buffer', 'name', 'contents', 'references', 'prev',
+                 'next', 'up')
 
     def __len__(self):
         return len(self.contents)
@@ -369,44 +548,52 @@ class Node:
         self.next: str
         self.up: str
         self.references: typing.List[Reference] = []
-        next_sep = SEP_R.search(file_buffer.contents, tag.nodestart + 1)
-        if next_sep is not None:
-            nodeend = next_sep.end()
-        else:
+        nodeend = _find_sep(file_buffer.contents, tag.nodestart + 1)
+        if nodeend < 0:
             raise RuntimeError("Can't find ending node seperator for"
                     f"{self.name}")
-        self.contents = file_buffer.contents[tag.nodestart:nodeend]
+        # Tag table offsets count bytes, so only decode once we've sliced.
+        self.contents = file_buffer.contents[tag.nodestart:nodeend].decode(
+                'utf-8', 'replace')
         self._scan()
 
     def _scan(self):
         # Read the first line of the node and set next, prev, and up
-        header = NODE_HEADER_R.search(self.contents).groupdict('')
-        if header:
-            self.prev = header['prev']
-            self.next = header['next']
-            self.up = '' if header['up'] == '(dir)' else header['up']
-        else:
+        contents = self.contents
+        header = NODE_HEADER_R.search(contents)
+        if header is None:
             raise RuntimeError(f"Can't find node header for {self.name}")
+        gd = header.groupdict('')
+        self.prev = gd['prev']
+        self.next = gd['next']
+        self.up = '' if gd['up'] == '(dir)' else gd['up']
 
         # Menu type references will scan from the first line to the second
         # empty line. Cross-references will take the whole thing and return a
         # singleton.
-        for m in self.hook.finditer(self.contents):
-            match m.lastindex:
-                case 1: # ReferenceHooks.INDEX
-                    s = m.start()
-                    e = next(islice(re.finditer('^$', self.contents[s:], re.M),
-                        1, 2)).start() + s
-                    source = Index(self.contents[s:e])
-                case 2: # ReferenceHooks.MENU
-                    s = m.start()
-                    e = next(islice(re.finditer('^$', self.contents[s:], re.M),
-                        1, 2)).start() + s
-                    source = Menu(self.contents[s:e])
-                case 3: # ReferenceHooks.X_REF
-                    s = m.start()
-                    e = m.end()
-                    source = XReference(self.contents[s:e])
-                case _:
-                    raise RuntimeError(f"Can't identify reference {m.group()}")
-            self.references.extend(source.refs)
+        # Every needle is queued at its next occurrence. The nearest one is
+        # confirmed by its hook and scanning resumes after the hook, which is
+        # what finditer over an alternation of the hooks would do.
+        pos = header.end()
+        queue = []
+        for k, (_, needle) in enumerate(_HOOK_NEEDLES):
+            s = contents.find(needle, pos)
+            if s >= 0:
+                queue.append((s, k))
+        heapq.heapify(queue)
+        while queue:
+            s, k = queue[0]
+            i, needle = _HOOK_NEEDLES[k]
+            m = _HOOK_R[i].match(contents, s) if s >= pos else None
+            if m is not None:
+                pos = m.end()
+                if _NEEDS_EMPTYLINE[i]:
+                    e = _second_empty_line(contents, s)
+                else:
+                    e = pos
+                self.references.extend(_SOURCES[i].iter_refs(contents, s, e))
+            s = contents.find(needle, max(s + 1, pos))
+            if s >= 0:
+                heapq.heapreplace(queue, (s, k))
+            else:
+                heapq.heappop(queue)
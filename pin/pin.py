@@ -38,7 +38,7 @@ parser.add_argument('pos', nargs='*', action='extend', metavar='MENU-ITEM')
 args = parser.parse_args()
 
 # References to the nodes to start the session with.
-refs: set[nodes.reference] = set()
+refs: set[nodes.Reference] = set()
 
 
 def get_initial_file() -> nodes.InfoFile:
@@ -85,12 +85,13 @@ if __name__ == '__main__':
 
     # Scan through the arguments go generate a list of references to load.
     initial_file = get_initial_file()
-    for f in args.file:
-        ref = nodes.reference()
+    for f in args.file or ():
+        ref = nodes.Reference()
         ref.filename = f
+        ref.nodename = 'Top'
         refs.add(ref)
 
-    for n in args.node + args.pos:
+    for n in (args.node or []) + args.pos:
         # If node is not in long format then search for it in the initial
         # loaded file.
         node_arg = parse_menu_item(n)
@@ -100,7 +101,7 @@ if __name__ == '__main__':
         else:
             filename = node_arg['file']
             nodename = node_arg['node']
-        ref = nodes.reference()
+        ref = nodes.Reference()
         ref.filename = filename
         ref.nodename = nodename
         refs.add(ref)
@@ -1,17 +1,21 @@
 
 """ui.py -- The interface given to the user."""
 
+import array
+import bisect
 import curses
+import operator
+import os
+import sys
 import typing
-from collections import ChainMap
+from itertools import accumulate, repeat
 from configparser import ConfigParser
 from dataclasses import dataclass
-from pathlib import PosixPath
 
-from pin import nodes
+from pin import nodes, utils
 
-# I wanted to put the arrow keys in a separate dict, but chainmaps cannot be
-# put within chainmaps.
+# I wanted to put the arrow keys in a separate dict, but they're merged with
+# the others into a single input map anyways.
 hard_coded_keys = {
         curses.KEY_LEFT: 'backward-char',
         curses.KEY_UP: 'prev-line',
@@ -186,6 +190,14 @@ default_keys = {
         'ZZ': 'quit'
         }
 
+# Actions are compared and looked up on every key press, and strings with
+# hyphens aren't interned on their own, so make equal names the same object.
+for _keys in (hard_coded_keys, original_keys, echo_keys, vi_keys,
+              default_keys):
+    for _key, _action in _keys.items():
+        _keys[_key] = sys.intern(_action)
+del _keys, _key, _action
+
 
 @dataclass
 class WindowState:
@@ -202,9 +214,9 @@ class LineMap():
     column number to the point number. It is used to convert point values into
     columns on screen and vice versa.
     """
-    node: Node
-    nline: int = 0
-    offsets: typing.List[int] = []
+    node: nodes.Node
+    nline: int = -1
+    offsets: typing.Sequence[int] = range(0)
 
     def __len__(self):
         return len(self.offsets)
@@ -219,17 +231,31 @@ class InfoWindow:
     assign to.
     """
 
-    def __init__(self, node):
-        """Node content-specific TUI parameters."""
+    def __init__(self, node, height: int, width: int):
+        """Node content-specific TUI parameters.
+
+        Nothing is laid out here, which needs curses; the session calls
+        layout() as soon as it makes the window, before any key reaches it.
+        """
         self._node = node
-        self.pad = curses.newpad(node.contents.count('\n'), 80)
+        self.height = height
+        self.width = width
+        self.pad = None
+        # Everything in the modeline before the location; set with the pad.
+        self._mode_prefix = ''
+        self._modeline_key = None
+        self._modeline = ''
+        self._last_drawn_page_top = -1
+        # Whether the pad holds anything the screen doesn't show yet.
+        self._pad_dirty = True
         self._page_top: int = 0
         self.point: int = 0
         self.goal_column = -1
         self.hist: typing.List[WindowState] = [WindowState(node, 0, 0)]
-        self.line_count = node.content.count('\n') + 1
-        self.line_starts: typing.List[int] = []
-        self.line_map: LineMap
+        self.line_starts: typing.Sequence[int] = array.array('i')
+        self._lop_cache_point = -1
+        self._lop_cache_line = 0
+        self.line_map = LineMap(node)
 
     @property
     def node(self):
@@ -239,14 +265,14 @@ class InfoWindow:
     @node.setter
     def node(self, value):
         self._node = value
-        self._calculate_line_starts()
+        self.layout()
         self.page_top = 0
         self.point = 0
-        self._refresh()
 
     @property
     def line_count(self) -> int:
-        pass
+        """Number of lines in the node."""
+        return len(self.line_starts)
 
     @property
     def page_top(self) -> int:
@@ -258,111 +284,134 @@ class InfoWindow:
 
     @page_top.setter
     def page_top(self, desired):
-        """Set the page_top, perhaps scrolling the screen to do so."""
-        if desired < 0:
-            desired = 0
-        elif desired > self.line_count:
-            desired = self.line_count - 1
+        """Set the page_top.
+
+        The screen isn't scrolled here; that waits until the session has
+        handled every key already typed, so a burst of scrolls is drawn once.
+        """
+        # The last page of the node is as far as the window scrolls.
+        desired = max(min(desired, self.line_count - self.height), 0)
 
         if self.page_top == desired:
             return
+        self._page_top = desired
 
-        old_pt = self.page_top
         # Make sure that point appears in this window
         point_line = self.line_of_point()
-        if point_line < self.page_top:
-            self.point = self.line_starts[self.page_top]
-        else:
-            if point_line < self.page_top + self.height:
-                return
-            bottom = self.page_top + self.height - 1
+        if point_line < desired:
+            self.point = self.line_starts[desired]
+        elif point_line >= desired + self.height:
+            bottom = min(desired + self.height, self.line_count) - 1
             self.point = self.line_starts[bottom]
 
-        # Find out which direction to scroll. Do this only if there would be
-        # savings in refresh time. This is true if the amount to scroll is less
-        # than the height of the window, and if the number of lines scrolled
-        # would be greater than 10% of the window's height
-
-        # To prevent status line blinking when keeping the up or down key,
-        # scrolling is disabled if the amount to scroll is 1.
-
-        if old_pt < desired:
-            amount = desired - old_pt
-            if (amount == 1 or amount >= self.height or
-                    (self.height - amount)*10 < self.height):
-                return
-            start = self.first_row()
-            end = start + self.height
-
-            # window_scroll
-        else:
-            amount = old_pt - desired
-            if (amount == 1 or amount >= self.height or
-                    (self.height - amount)*10 < self.height):
-                return
-            start = self.first_row()
-            end = start + self.height
-
-
-
-        self.scr.refresh()
-
     @property
     def cursor_column(self):
-        return self.point := self.point_to_column(self.point)
+        """Column of point within its line."""
+        return self.point_to_column(self.point)
 
     def _calculate_line_starts(self):
         """Calculate a list of line starts for the current node."""
-        c = 0
-        for line in self.node.contents.splitlines(True):
-            self.line_starts.append(c)
-            c += len(line)
+        # Each line starts one past the end of the one before it. Splitting,
+        # measuring and summing are all done in C; the last piece is dropped
+        # since nothing starts after it. They go in a C int array: 4 bytes a
+        # line rather than a pointer and an int object, and bisect still works.
+        lines = self.node.contents.split('\n')
+        self.line_starts = array.array('i', accumulate(
+            map(operator.add, map(len, lines[:-1]), repeat(1)), initial=0))
+        # Lines of points in the old node mean nothing in the new one.
+        self._lop_cache_point = -1
+        self._lop_cache_line = 0
 
     # TODO: Support wide characters.
     def _compute_line_map(self):
-        """Compute the line map for the current line in our window."""
+        """Compute the line map for the current line in our window.
+
+        Every character is one column wide, so the map is just the range of
+        points from the start of the line up to the start of the next one.
+        """
         line = self.line_of_point()
-        if (self.life_map.node == self.node and self.line_map.nline == line and
-                self.line_map.used):
+        if self.line_map.node is self.node and self.line_map.nline == line:
             return
-        self.line_map = LineMap(self.node)
-        self.line_map.node = self.node
-        self.line_map.nline = line
-        
+        start = self.line_starts[line]
         if line + 1 < self.line_count:
-            endi = self.node.contents + self.line_starts[line + 1]
+            end = self.line_starts[line + 1]
         else:
-            endi = self.node.contents + len(self.node)
-        
-        for i,c in enumerate(self.node.contents[self.line_starts[line]:]):
-            self.line_map.offsets.append(i + self.line_starts[line])
+            end = len(self.node.contents)
+        self.line_map = LineMap(self.node, line, range(start, end))
 
     def _refresh(self):
-        self.pad.refresh(self.page_top, 0, 0, 0, self.height, self.width)
+        """Copy the part of the pad that starts at page_top to the screen.
+
+        This only updates curses' idea of the screen; the terminal is sent
+        the changes by the doupdate in display_cursor_at_point. GNU Info
+        works out by hand when scrolling the screen pays off. Here curses
+        does it instead: because the pad has idlok set, doupdate finds the
+        rows that are still visible after scrolling and has the terminal move
+        them, so only the rows that came into view are sent. Nothing is done
+        if the window hasn't moved or changed since it was last drawn.
+        """
+        if (not self._pad_dirty
+                and self.page_top == self._last_drawn_page_top):
+            return
+        self.pad.noutrefresh(self.page_top, 0, 0, 0,
+                             self.height - 1, self.width - 1)
+        self._last_drawn_page_top = self.page_top
+        self._pad_dirty = False
+
+    def layout(self):
+        """Find the lines of the node and make a pad to hold them."""
+        self._calculate_line_starts()
+        # The line starts already counted the lines; don't scan for them again.
+        self.pad = curses.newpad(self.line_count, 80)
+        self.pad.idlok(True)
+        self._pad_dirty = True
+        name = self.node.file_buffer.filename.split('.')[0]
+        # Remove the parentheses and you get a syntax error
+        self._mode_prefix = (f"-----Info: ({name}){self.node.name}, " +
+                             f"{self.line_count} lines --")
+
+    def touch(self):
+        """Have the next draw copy the whole window to the screen again.
+
+        Windows share the screen, so one that is shown again after another
+        was drawn over it can't trust that the screen still holds its text.
+        """
+        self._pad_dirty = True
 
     def line_of_point(self) -> int:
-        """Line containing self.point."""
-        return next(i-1 for i, o in enumerate(self.line_starts) if o >=
-                    self.point)
+        """Line containing self.point.
+
+        Most commands ask for this several times without moving point, so
+        the last answer is kept until either point or the node changes.
+        """
+        if self.point == self._lop_cache_point:
+            return self._lop_cache_line
+        line = bisect.bisect_right(self.line_starts, self.point) - 1
+        self._lop_cache_point = self.point
+        self._lop_cache_line = line
+        return line
 
     def point_to_column(self, point: int) -> int:
         """Tranlate the value of a point into a column number."""
         self._compute_line_map()
-        if (point < self.line_map.offsets[0]):
+        if not self.line_map.offsets or point < self.line_map.offsets[0]:
             return 0
-        return next(i for i,o in enumerate(self.line_map.offsets) if o >= point)
+        return bisect.bisect_left(self.line_map.offsets, point)
 
-    def first_row(self):
-        """Offset for the line of point."""
-        return self.line_starts(self.page_top)
-
-    def make_modeline(self):
+    def make_modeline(self) -> str:
         """
+        Build the modeline describing where the window is in its node.
 
-        Copied from gnu Info."""
+        Copied from gnu Info. The last modeline is kept, and only built again
+        once the node, the part of it shown or the window size changes.
+        """
+        key = (self.node, self.page_top, self.line_count, self.height,
+               self.width)
+        if key == self._modeline_key:
+            return self._modeline
         # Find the number of lines actually displayed in this window
-        lines_remaining = self.line_count - self.state.page_top
-        if self.state.page_top == 0:
+        lines_remaining = self.line_count - self.page_top
+        if self.page_top == 0:
             if lines_remaining <= self.height:
                 location_indicator = 'All'
             else:
@@ -372,15 +421,13 @@ class InfoWindow:
                 location_indicator = 'Bot'
             else:
                 lc = self.line_count - self.height
-                percent = 100*self.state.page_top/lc
-                location_indicator = "{2f}%".format(percent)
+                percent = 100*self.page_top/lc
+                location_indicator = f"{percent:2.0f}%"
 
-        # Calculate the maximum size of the information to stick in modeline
-        name = self.state.node.filename.split('.')[0]
-        # Remove the parentheses and you get a syntax error
-        mode = (f"-----Info: ({name}){self.state.node}, " +
-                f"{self.line_count} lines --{location_indicator}")
-        mode += '-'*(self.width - len(mode))
+        mode = self._mode_prefix + location_indicator
+        self._modeline = mode.ljust(self.width, '-')
+        self._modeline_key = key
+        return self._modeline
 
     def goto_percentage(self, percent: int):
         """Make window display at given percentage of the node."""
@@ -396,25 +443,28 @@ class InfoWindow:
     def point_next_line(self):
         """Advance point to the beginning of the next logical line.
 
-        Also compute line map of new line.
+        Also compute line map of new line. Point stays put on the last line.
         """
         line = self.line_of_point()
-        self.point = self.line_starts[line + 1]
+        if line + 1 < self.line_count:
+            self.point = self.line_starts[line + 1]
         self._compute_line_map()
 
     def point_prev_line(self):
         """Move point to the end of the previous logical line.
 
-        Also compute line map of new line.
+        Also compute line map of new line. Point stays put on the first line.
         """
         line = self.line_of_point()
-        self.point = self.line_starts[line - 1]
+        if line > 0:
+            self.point = self.line_starts[line - 1]
         self._compute_line_map()
 
     def move_to_goal(self):
-        if self.goal_column >= len(self.line_map):
+        goal = self.goal_column
+        if goal >= len(self.line_map):
             goal = len(self.line_map) - 1
-        self.point = self.line_map.offsets[self.goal_column]
+        self.point = self.line_map.offsets[goal]
         self.show_point()
 
     def adjust_pagetop(self):
@@ -428,12 +478,25 @@ class InfoWindow:
             self.page_top = 0 if pt_center < 0 else pt_center
 
     def show_point(self):
-        """Scroll window so that point is visible & move terminal cursor there.
+        """Scroll window so that point is visible.
 
-        Used after cursor movement commands.
+        Used after cursor movement commands. The terminal cursor follows
+        point when the session next draws the window.
         """
         self.adjust_pagetop()
-        self.display_cursor_at_point()
+
+    def display_cursor_at_point(self):
+        """Draw the window and move the terminal cursor to point.
+
+        The pad is only copied to the screen again if something moved or
+        changed since it was last drawn; otherwise just the cursor moves.
+        Either way the terminal is updated once, with the cursor already
+        where it belongs.
+        """
+        self._refresh()
+        curses.setsyx(self.line_of_point() - self.page_top,
+                      self.cursor_column)
+        curses.doupdate()
 
     def message_echo_area(self, fstr: str, *args):
         """Populate the echo area.
@@ -449,27 +512,179 @@ class InfoSession:
 
     def __init__(self, refs: typing.Set[nodes.Reference]):
         """Load settings and start up curses."""
-        self.refs = refs
+        self.refs = list(refs)
+        # Each manual is loaded once, by the first window that shows it.
         self.loaded_buffers: dict[str, nodes.FileBuffer] = {}
-        self.windows: typing.List[InfoWindow] = []
-        try_strings = (
-                '~/.pin.ini',
-                '~/.config/pin/pin.ini',
-                )
-        try_paths = map(lambda x: PosixPath(x).expanduser(), try_strings)
-        config_file = next(p for p in try_paths if p.exists())
+        # A window, and its node's pad, is only made once it's shown.
+        self.windows: typing.Sequence[InfoWindow] = utils.LazyList(
+                self._open_window, self.refs)
         self.config = ConfigParser()
-        self.config.read(config_file)
-        self.input_map = ChainMap(
-                default_keys, hard_coded_keys, self.config['keys'])
-        for r in refs:
-            new_buf = nodes.FileBuffer(nodes.InfoFile(PosixPath(r.filename)))
-            self.loaded_buffers[r.filename] = new_buf
-            self.windows.append(InfoWindow(new_buf.nodes[r.nodenode]))
-        self.scr = curses.init
+        for name in ('~/.pin.ini', '~/.config/pin/pin.ini'):
+            path = os.path.expanduser(name)
+            if os.path.exists(path):
+                self.config.read(path)
+                break
+        # The maps never change once we're running, so merge them now rather
+        # than walking a ChainMap on every key press. Later maps win.
+        user_keys = (self.config['keys'] if self.config.has_section('keys')
+                     else {})
+        self.input_map = {**user_keys, **hard_coded_keys, **default_keys}
+        self.scr = curses.initscr()
         self.height, self.width = self.scr.getmaxyx()
         curses.cbreak()
         curses.noecho()
+        self.cur_window = self.windows[0]
+        self._key_actions = self._build_key_actions()
+        dispatch: typing.Dict[str, typing.Callable[[], None]] = {
+                'first-node': self._first_node,
+                'last-node': self._last_node,
+                'beginning-of-node': self._beginning_of_node,
+                'end-of-node': self._end_of_node,
+                'next-line': self._next_line,
+                'prev-line': self._prev_line,
+                'beginning-of-line': self._beginning_of_line,
+                'end-of-line': self._end_of_line,
+                'scroll-forward-page-only': self._scroll_forward_page_only,
+                'scroll-backward-page-only': self._scroll_backward_page_only,
+                'down-line': self._down_line,
+                'up-line': self._up_line,
+                'scroll-half-screen-down': self._scroll_half_screen_down,
+                'scroll-half-screen-up': self._scroll_half_screen_up,
+                'next-node': self._next_node,
+                'prev-node': self._prev_node,
+                'up-node': self._up_node,
+                'global-next-node': self._global_next_node,
+                'global-prev-node': self._global_prev_node,
+                }
+        self._dispatch = {sys.intern(k): v for k, v in dispatch.items()}
+
+    def _open_window(self, ref: nodes.Reference) -> InfoWindow:
+        """Make a window showing the node ref points to.
+
+        Windows onto the same file share the buffer already loaded for it.
+        """
+        buf = self.loaded_buffers.get(ref.filename)
+        if buf is None:
+            buf = nodes.FileBuffer.open(ref.filename)
+            self.loaded_buffers[ref.filename] = buf
+        window = InfoWindow(buf.nodes[ref.nodename], self.height, self.width)
+        # Keys for the window may be handled before it's ever drawn.
+        window.layout()
+        return window
+
+    def _build_key_actions(self) -> typing.Dict[int, str]:
+        """Map every key code getch can return to the action bound to it.
+
+        This way a key press is a single lookup, with no naming the key and
+        decoding the name. curses names control keys '^A' while the key maps
+        write '^a', so those are looked up from their codes, 1 to 26.
+        """
+        key_actions = {}
+        for code in range(curses.KEY_MAX):
+            action = self.input_map.get(curses.keyname(code).decode('latin-1'))
+            if action is not None:
+                key_actions[code] = sys.intern(action)
+        for code in range(1, 27):
+            action = self.input_map.get('^' + chr(ord('a') + code - 1))
+            if action is not None:
+                key_actions[code] = sys.intern(action)
+        return key_actions
+
+    # Commands bound to keys. Only the movement commands are implemented;
+    # anything else in the key maps is simply ignored by run().
+    def _first_node(self):
+        w = self.cur_window
+        w.node = w.node.file_buffer.nodes[0]
+
+    def _last_node(self):
+        w = self.cur_window
+        w.node = w.node.file_buffer.nodes[-1]
+
+    def _beginning_of_node(self):
+        self.cur_window.page_top = 0
+
+    def _end_of_node(self):
+        w = self.cur_window
+        w.page_top = w.line_count - self.height
+
+    def _next_line(self):
+        w = self.cur_window
+        if w.goal_column == -1:
+            w.goal_column = w.cursor_column
+        w.point_next_line()
+        w.move_to_goal()
+
+    def _prev_line(self):
+        w = self.cur_window
+        if w.goal_column == -1:
+            w.goal_column = w.cursor_column
+        w.point_prev_line()
+        w.move_to_goal()
+
+    def _beginning_of_line(self):
+        w = self.cur_window
+        point = w.line_map[0]
+        if point != w.point:
+            w.point = point
+            w.show_point()
+
+    def _end_of_line(self):
+        w = self.cur_window
+        point = w.line_map[-1]
+        if point != w.point:
+            w.point = point
+            w.show_point()
+
+    def _scroll_forward_page_only(self):
+        self.cur_window.page_top += self.height
+
+    def _scroll_backward_page_only(self):
+        self.cur_window.page_top -= self.height
+
+    def _down_line(self):
+        self.cur_window.page_top += 1
+
+    def _up_line(self):
+        self.cur_window.page_top -= 1
+
+    def _scroll_half_screen_down(self):
+        self.cur_window.page_top += self.height // 2
+
+    def _scroll_half_screen_up(self):
+        self.cur_window.page_top -= self.height // 2
+
+    def _goto_node(self, name: typing.Optional[str]):
+        """Show the node called name from the current file, if it has one.
+
+        Links into other files, like '(file)Node', aren't followed yet.
+        """
+        w = self.cur_window
+        nodes_d = w.node.file_buffer.nodes
+        if name in nodes_d:
+            w.node = nodes_d[name]
+
+    def _next_node(self):
+        self._goto_node(self.cur_window.node.next)
+
+    def _prev_node(self):
+        self._goto_node(self.cur_window.node.prev)
+
+    def _up_node(self):
+        self._goto_node(self.cur_window.node.up)
+
+    def _global_next_node(self):
+        w = self.cur_window
+        nodes_d = w.node.file_buffer.nodes
+        i = nodes_d.index(w.node.name)
+        if i + 1 < len(nodes_d):
+            w.node = nodes_d[i + 1]
+
+    def _global_prev_node(self):
+        w = self.cur_window
+        nodes_d = w.node.file_buffer.nodes
+        i = nodes_d.index(w.node.name)
+        if i > 0:
+            w.node = nodes_d[i - 1]
 
     # Ugh. I'm sick of this. I really ought to just use prompt-toolkit instead
     # of directly using curses. However there's no way to remap the vi mappings
@@ -477,130 +692,33 @@ class InfoSession:
     # Or you can just rewrite it all in Go.
     def run(self):
         """Run this session."""
+        # Bound once here rather than looked up again for every key.
+        getch = self.scr.getch
+        hard_keys = hard_coded_keys
+        key_actions = self._key_actions
+        dispatch = self._dispatch
+        windows = self.windows
+        nodelay = self.scr.nodelay
+        self.cur_window.display_cursor_at_point()
         while True:
-            raw_key = curses.getch()
-            if 48 <= raw_key <= 57:
-                self.cur_window = self.windows[int(chr(raw_key))]
-            elif raw_key in hard_coded_keys:
-                pass
-            else:
-                action = keys[curses.keyname(raw_key)]
-                match action:
-                    # Unfortunately we have no control over how a varible is
-                    # treated (i.e. as a variable or a reference), so there's
-                    # no way to shorten much of this code.
-                    case 'first-node':
-                        self.cur_window.node =
-                        self.cur_window.node.file_buffer.nodes[0]
-                    case 'last-node':
-                        self.cur_window.node =
-                        self.cur_window.node.file_buffer.nodes[-1]
-                    case 'beginning-of-node':
-                        self.cur_window.page_top = 0
-                    case 'end-of-node':
-                        self.cur_window.page_top = self.cur_window.pad.rows -
-                        self.height
-                    case 'next-line':
-                        if self.cur_window.goal_column == -1:
-                            self.cur_window.goal_column =
-                                self.cur_window.cursor_column
-                        self.cur_window.point_next_line()
-                        self.cur_window.move_to_goal()
-                    case 'prev-line':
-                        if self.cur_window.goal_column == -1:
-                            self.cur_window.goal_column =
-                                self.cur_window.cursor_column
-                        self.cur_window.point_prev_line()
-                        self.cur_window.move_to_goal()
-                    case 'beginning-of-line':
-                        point = self.cur_window.line_map[0]
-                        if point != self.cur_window.point:
-                            self.cur_window.point = point
-                            self.show_point()
-                    case 'end-of-line':
-                        point = self.cur_window.line_map[-1]
-                        if point != self.cur_window.point:
-                            self.cur_window.point = point
-                            self.cur_window.show_point()
-                    case 'scroll-forward-page-only':
-                        self.cur_window.page_top += self.height
-                    case 'scroll-backward-page-only':
-                        self.cur_window.page_top -= self.height
-                    case 'down-line':
-                        self.cur_window.page_top += 1
-                    case 'up-line':
-                        self.cur_window.page_top -= 1
-                    case 'scroll-half-screen-down':
-                        self.cur_window.page_top += self.height // 2
-                    case 'scroll-half-screen-up':
-                        self.cur_window.page_top -= self.height // 2
-                    case 'next-node' if self.cur_window.node.next:
-                        self.cur_window.node =
-                        self.cur_window.file_buffer.nodes[
-                                self.cur_window.node.next]
-                    case 'prev-node' if self.cur_window.node.prev:
-                        self.cur_window.node =
-                        self.cur_window.file_buffer.nodes[
-                                self.cur_window.node.prev]
-                    case 'global-next-node':
-                        self.cur_window.node =
-                        self.cur_window.node.file_buffer.after(
-                                self.cur_window.node)
-                    case 'global-prev-node':
-                        self.cur_window.node =
-                        self.cur_window.node.file_buffer.before(
-                                self.cur_window.node)
-                    case 'up-node':
-                        self.cur_window.node =
-                        self.cur_window.node.file_buffer.before(
-                                self.cur_window.up)
-                    case 'history-node':
-                        pass
-                    case 'top-node':
-                        pass
-                    case 'dir-node':
-                        pass
-                    case 'goto-node':
-                        pass
-                    case 'goto-invocation':
-                        pass
-                    case 'list-visited-nodes':
-                        pass
-                    case 'search':
-                        pass
-                    case 'search-backword':
-                        pass
-                    case 'search-next':
-                        pass
-                    case 'search-previous':
-                        pass
-                    case 'toggle-regexp':
-                        pass
-                    case 'search-case-sensitively':
-                        pass
-                    case 'isearch-forward':
-                        pass
-                    case 'isearch-backward':
-                        pass
-                    case 'tree-search':
-                        pass
-                    case 'tree-search-next':
-                        pass
-                    case 'tree-search-previous':
-                        pass
-                    case 'index-search':
-                        pass
-                    case 'virtual-index':
-                        pass
-                    case 'next-index-match':
-                        pass
-                    case 'index-apropos':
-                        pass
-                    case 'move-to-next-xref':
-                        pass
-                    case 'move-to-prev-xref':
-                        pass
-                    case 'select-reference-this-line':
-                        pass
-                    case 'abort-key':
-                        pass
+            # Wait for a key, then handle every key typed since before
+            # drawing anything, so that holding a key down only draws the
+            # state after the last one instead of one frame per key.
+            nodelay(False)
+            raw_key = getch()
+            nodelay(True)
+            while raw_key != -1:
+                if 48 <= raw_key <= 57:
+                    number = raw_key - 48
+                    if (number < len(windows)
+                            and windows[number] is not self.cur_window):
+                        self.cur_window = windows[number]
+                        self.cur_window.touch()
+                elif raw_key in hard_keys:
+                    pass
+                else:
+                    handler = dispatch.get(key_actions.get(raw_key))
+                    if handler is not None:
+                        handler()
+                raw_key = getch()
+            self.cur_window.display_cursor_at_point()
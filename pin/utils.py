@@ -1,37 +1,131 @@
 
-from collections import UserDict
+from collections.abc import Sequence
 
-class DList(UserDict):
+class DList(dict):
     """
     This is a dictionary that can get and set its elements as though it were a
     list. This is possible because dictionaries in python are now ordered by
     insertion.
 
     However, this comes with the restriction that all keys must be strings.
+    The keys are also kept in a list, along with the position of each key, so
+    that indexing by position doesn't have to go through every key first.
+    Subclassing dict rather than UserDict means iterating, len and membership
+    tests run in C, and an item lookup costs one Python call instead of two.
     """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._reindex()
+
+    def _reindex(self):
+        self._keys_list: list[str] = list(dict.keys(self))
+        self._key_index: dict[str, int] = {
+                k: i for i, k in enumerate(self._keys_list)}
+
     def __getitem__(self, k):
-        if isinstance(k, str):
-            return self.data[k]
-        elif isinstance(k, int):
-            return list(self.values())[k]
+        if isinstance(k, int):
+            return dict.__getitem__(self, self._keys_list[k])
+        elif isinstance(k, str):
+            return dict.__getitem__(self, k)
         else:
             raise KeyError(k)
 
     def __setitem__(self, k, v):
         if isinstance(k, str):
-            self.data[k] = v
+            if k not in self:
+                self._key_index[k] = len(self._keys_list)
+                self._keys_list.append(k)
+            dict.__setitem__(self, k, v)
         elif isinstance(k, int):
-            real_key = list(self.keys())[k]
-            self.data[real_key] = v
+            dict.__setitem__(self, self._keys_list[k], v)
         else:
             raise KeyError(k)
 
+    def __delitem__(self, k):
+        if isinstance(k, int):
+            k = self._keys_list[k]
+        elif not isinstance(k, str):
+            raise KeyError(k)
+        dict.__delitem__(self, k)
+        index = self._key_index.pop(k)
+        del self._keys_list[index]
+        for i in range(index, len(self._keys_list)):
+            self._key_index[self._keys_list[i]] = i
+
+    # dict's own versions of these, down to copy(), don't go through
+    # __setitem__ or __delitem__, so they would leave the key list behind or
+    # return a plain dict.
+    def update(self, *args, **kwargs):
+        for k, v in dict(*args, **kwargs).items():
+            self[k] = v
+
+    def setdefault(self, k, default=None):
+        if k not in self:
+            self[k] = default
+        return self[k]
+
+    def pop(self, k, *default):
+        if k in self:
+            v = dict.__getitem__(self, k)
+            del self[k]
+            return v
+        return dict.pop(self, k, *default)
+
+    def popitem(self):
+        k = self._keys_list[-1]
+        return k, self.pop(k)
+
+    def clear(self):
+        dict.clear(self)
+        self._reindex()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __or__(self, other):
+        new = self.copy()
+        new.update(other)
+        return new
+
+    def copy(self):
+        return type(self)(self)
+
+    # The key list is only built by __init__, which pickling and the copy
+    # module would skip, so have them rebuild a DList from the plain items.
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+    def index(self, k: str) -> int:
+        return self._key_index[k]
+
     def before(self, k: str, count=1):
-        lkeys = list(self)
-        index = lkeys.index(k)
-        return self[index - count]
+        return self[self._key_index[k] - count]
 
     def after(self, k: str, count=1):
-        lkeys = list(self)
-        index = lkeys.index(k)
-        return self[index + count]
+        return self[self._key_index[k] + count]
+
+
+_UNMADE = object()
+
+class LazyList(Sequence):
+    """
+    A read-only list whose elements are made from a list of sources the first
+    time each one is accessed, by calling factory with that element's source.
+    Elements that are never looked at are never made.
+    """
+    def __init__(self, factory, sources):
+        self._factory = factory
+        self._sources = list(sources)
+        self._items = [_UNMADE] * len(self._sources)
+
+    def __len__(self):
+        return len(self._sources)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        item = self._items[i]
+        if item is _UNMADE:
+            item = self._items[i] = self._factory(self._sources[i])
+        return item
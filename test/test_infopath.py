@@ -0,0 +1,22 @@
+
+"""test_infopath.py -- Unit tests for infopath handling."""
+
+import unittest
+
+from pin import infopath
+
+
+class TestIPath(unittest.TestCase):
+    """Test the paths used for the infopath."""
+
+    def test_equal(self):
+        """Paths to the same directory are equal and hash the same."""
+        self.assertEqual(infopath.IPath('/tmp'), infopath.IPath('/tmp'))
+        self.assertEqual(infopath.IPath('/tmp'), infopath.IPath('/tmp/'))
+        self.assertEqual(hash(infopath.IPath('/tmp')),
+                         hash(infopath.IPath('/tmp/../tmp')))
+        self.assertEqual(len({infopath.IPath('.'), infopath.IPath('./')}), 1)
+
+    def test_str(self):
+        """Paths still keep what they were constructed with."""
+        self.assertEqual(str(infopath.IPath('/tmp')), '/tmp')
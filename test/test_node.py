@@ -1,9 +1,17 @@
 
 """test_nodes.py -- Unit tests for info parsing."""
 
+import gzip
+import os
+import shutil
+import tempfile
 import unittest
 import textwrap
+from unittest import mock
 
+import regex as re
+
+from pin import infopath
 from pin import nodes
 
 
@@ -104,6 +112,69 @@ class TestNode(unittest.TestCase):
         self.assertEqual(indicies[3].nodename, 'cmp Options')
         self.assertEqual(indicies[3].line_number, 97)
 
+    def test_interleaved_hooks(self):
+        """Find the references of every source, in order, wherever they are.
+
+        The node is scanned the way an alternation of the hooks would be, so
+        the two have to agree even when hooks sit inside each other's text.
+        """
+        pre = 'This is sample.info.\n\n'
+        body = ('\x1f\nFile: sample.info,  Node: Top,  Up: (dir)\n\n'
+                'See * Note: Tabs:: and x * Menu: in passing.\n\n'
+                '\x00\x08[index\x00\x08]\n* Menu:\n'
+                '* tab stops:  Tabs.  (line 3)\n'
+                '* * note: in an index:  Pagination.  (line 9)\n'
+                '* Menu:\n\n* Tabs::  Tab stops.\n* Pagination::  Pages.\n\n'
+                '* note: Trailing Blanks:: at the end.\n'
+                '* Menu:\n* Trailing Blanks::\n')
+        main = (f'{pre}{body}\x1f\nTag Table:\nNode: Top\x7f{len(pre)}\n'
+                '\x1f\nEnd Tag Table\n').encode()
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'sample.info')
+            with open(path, 'wb') as f:
+                f.write(main)
+            node = nodes.FileBuffer(nodes.InfoFile(path)).nodes['Top']
+
+        contents = node.contents
+        hooks = re.compile('|'.join(f'({h.value})'
+                                    for h in nodes.ReferenceHooks),
+                           re.MULTILINE)
+        expected = []
+        pos = nodes.NODE_HEADER_R.search(contents).end()
+        for m in hooks.finditer(contents, pos):
+            i = m.lastindex
+            if nodes._NEEDS_EMPTYLINE[i]:
+                end = nodes._second_empty_line(contents, m.start())
+            else:
+                end = m.end()
+            expected.extend(
+                    nodes._SOURCES[i].iter_refs(contents, m.start(), end))
+        self.assertEqual(node.references, expected)
+        self.assertEqual([r.nodename for r in node.references],
+                         ['Tabs', 'Tabs', 'Pagination', 'Trailing Blanks'])
+        self.assertEqual(node.references[0].label, 'tab stops')
+
+
+class TestInfoFile(unittest.TestCase):
+    """Test finding info files along the infopath."""
+
+    @mock.patch.object(infopath, 'infodirs', {infopath.IPath('test')})
+    def test_lookup(self):
+        """Find a file by its name without the '.info' suffix."""
+        file = nodes.InfoFile('sample')
+        self.assertEqual(file.name, 'sample.info')
+        self.assertFalse(file.is_compressed)
+        with self.assertRaises(FileNotFoundError):
+            nodes.InfoFile('missing')
+
+    @mock.patch.object(infopath, 'infodirs', {infopath.IPath('test')})
+    def test_found_path(self):
+        """The path of the file is the one found, not the name given."""
+        file = nodes.InfoFile('sample')
+        self.assertEqual(str(file), os.path.join('test', 'sample.info'))
+        self.assertEqual(str(nodes.InfoFile(file)), str(file))
+        self.assertEqual(str(file.parent), 'test')
+
 
 class TestFileBuffer(unittest.TestCase):
     """Test the code on a tiny info file."""
@@ -144,6 +215,7 @@ class TestFileBuffer(unittest.TestCase):
 
         self.assertEqual(first_node.name, 'Top')
         self.assertTrue(first_node.contents)
+        self.assertFalse(hasattr(first_node, '__dict__'))
         self.assertEqual(first_node.prev, '')
         self.assertEqual(first_node.next, 'Invoking sample')
         self.assertEqual(first_node.up, '')
@@ -163,3 +235,57 @@ class TestFileBuffer(unittest.TestCase):
         self.assertEqual(last_node.references[0], last_node.references[1])
         self.assertEqual(last_node.references[0].label, 'invoking sample')
         self.assertEqual(last_node.references[1].label, 'sample')
+
+    def test_open(self):
+        """Share one buffer between everyone opening the same file."""
+        first = nodes.FileBuffer.open('test/sample.info')
+        self.assertIs(nodes.FileBuffer.open(self.file), first)
+        self.assertIsNot(first, self.buffer)
+
+    def test_find_sep(self):
+        """Find node separators the same way SEP_R does."""
+        for text in (self.buffer.contents[:], b'\x1f', b'a\x1f\n\x1f\x0c\r\n'):
+            for start in range(len(text) + 1):
+                m = nodes.SEP_R.search(text, start)
+                self.assertEqual(nodes._find_sep(text, start),
+                                 m.end() if m else -1)
+
+    def test_compressed(self):
+        """Load the same file after compressing it with gzip."""
+        with tempfile.TemporaryDirectory() as d:
+            gz_path = os.path.join(d, 'sample.info.gz')
+            with open('test/sample.info', 'rb') as src, \
+                    gzip.open(gz_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            gz_buffer = nodes.FileBuffer(nodes.InfoFile(gz_path))
+        self.assertEqual(gz_buffer.contents, self.buffer.contents[:])
+        self.assertEqual(len(gz_buffer.tags), 4)
+
+    def test_indirect(self):
+        """Leave out the tags of a split manual instead of misreading them."""
+        main = (b'This is sample.info.\n\n\x1f\nIndirect:\n'
+                b'sample.info-1: 100\n\x1f\nTag Table:\n(Indirect)\n'
+                b'Node: Top\x7f100\nNode: Index\x7f900\n\x1f\n'
+                b'End Tag Table\n')
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'sample.info')
+            with open(path, 'wb') as f:
+                f.write(main)
+            buffer = nodes.FileBuffer(nodes.InfoFile(path))
+            self.assertEqual(buffer.tags, [])
+            self.assertEqual(len(buffer.nodes), 0)
+
+    def test_non_ascii_tag(self):
+        """Keep the tags of nodes whose names aren't ASCII."""
+        main = ('This is sample.info.\n\n\x1f\nFile: sample.info,  '
+                'Node: Überblick,  Up: (dir)\n\nÜberblick\n\x1f\n'
+                'Tag Table:\nNode: Überblick\x7f22\n\x1f\n'
+                'End Tag Table\n').encode()
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'sample.info')
+            with open(path, 'wb') as f:
+                f.write(main)
+            buffer = nodes.FileBuffer(nodes.InfoFile(path))
+            self.assertEqual([t.nodename for t in buffer.tags], ['Überblick'])
+            self.assertEqual(buffer.tags[0].nodestart, 22)
+            self.assertEqual(buffer.nodes['Überblick'].up, '')
@@ -0,0 +1,209 @@
+
+"""test_ui.py -- Unit tests for the parts of the interface without curses."""
+
+import unittest
+from unittest import mock
+
+from pin import nodes
+from pin import ui
+
+
+class TestInfoWindow(unittest.TestCase):
+    """Test moving around a node of sample.info."""
+
+    def setUp(self):
+        """Show the 16 line Top node in a window 5 lines high."""
+        # Laying out a window makes a pad, which curses can't do without a
+        # terminal.
+        patcher = mock.patch.object(ui.curses, 'newpad')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.buffer = nodes.FileBuffer(nodes.InfoFile('test/sample.info'))
+        self.node = self.buffer.nodes['Top']
+        self.window = ui.InfoWindow(self.node, 5, 40)
+        self.window.layout()
+
+    def test_line_starts(self):
+        """Each newline starts a line."""
+        contents = self.node.contents
+        starts = [0] + [i + 1 for i, c in enumerate(contents) if c == '\n']
+        self.assertEqual(list(self.window.line_starts), starts)
+        self.assertEqual(self.window.line_count, 16)
+
+    def test_line_of_point(self):
+        """Find the line that point is on."""
+        window = self.window
+        starts = window.line_starts
+        for line in range(window.line_count):
+            window.point = starts[line]
+            self.assertEqual(window.line_of_point(), line)
+            if line + 1 < window.line_count:
+                # The newline ending a line is still part of it
+                window.point = starts[line + 1] - 1
+                self.assertEqual(window.line_of_point(), line)
+
+    def test_line_map(self):
+        """Map the columns of only the line point is on."""
+        window = self.window
+        starts = window.line_starts
+        window.point = starts[3] + 2
+        self.assertEqual(window.cursor_column, 2)
+        self.assertEqual(window.line_map.nline, 3)
+        self.assertEqual(window.line_map.offsets, range(starts[3], starts[4]))
+        window.point = starts[-1]
+        self.assertEqual(window.cursor_column, 0)
+        self.assertEqual(window.line_map.offsets,
+                         range(starts[-1], len(self.node.contents)))
+
+    def test_modeline(self):
+        """Describe where the window is in the node."""
+        window = self.window
+        modeline = window.make_modeline()
+        self.assertEqual(modeline,
+                         '-----Info: (sample)Top, 16 lines --Top--')
+        self.assertIs(window.make_modeline(), modeline)
+        window.page_top = 4
+        self.assertTrue(window.make_modeline().endswith('--36%--'))
+        window.page_top = 11
+        self.assertTrue(window.make_modeline().endswith('--Bot--'))
+        self.assertEqual(len(window.make_modeline()), window.width)
+        window.page_top = 0
+        self.assertTrue(window.make_modeline().endswith('--Top--'))
+        window.height = 40
+        self.assertEqual(window.make_modeline(),
+                         '-----Info: (sample)Top, 16 lines --All--')
+        window.node = self.buffer.nodes['Index']
+        self.assertEqual(window.make_modeline(),
+                         '-----Info: (sample)Index, 14 lines --All')
+
+    def test_page_top_clamp(self):
+        """Scroll no further than the first and last pages."""
+        window = self.window
+        window.page_top = -3
+        self.assertEqual(window.page_top, 0)
+        window.page_top = window.line_count
+        self.assertEqual(window.page_top, 11)
+        # Like down-line after scroll-forward has reached the end.
+        window.page_top += 1
+        self.assertEqual(window.page_top, 11)
+        self.assertEqual(window.line_of_point(), 11)
+        window.page_top -= 20
+        self.assertEqual(window.page_top, 0)
+        self.assertEqual(window.line_of_point(), 4)
+
+    def test_page_top_short_node(self):
+        """A node shorter than the window never scrolls."""
+        window = ui.InfoWindow(self.buffer.nodes['Invoking sample'], 20, 40)
+        window.layout()
+        window.page_top = 5
+        self.assertEqual(window.page_top, 0)
+
+
+def _keyname(code: int) -> bytes:
+    """Name keys the way curses does, for the keys the tests press."""
+    if code < 32:
+        return b'^' + bytes([code + 64])
+    return bytes([code])
+
+
+class _Quit(Exception):
+    """Raised by the mocked getch to leave the session's loop."""
+
+
+class TestInfoSession(unittest.TestCase):
+    """Test the commands of a session on sample.info."""
+
+    def setUp(self):
+        """Start a session on Top and Index with curses mocked out."""
+        patcher = mock.patch.object(ui, 'curses')
+        self.curses = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.curses.initscr.return_value.getmaxyx.return_value = (5, 40)
+        self.curses.KEY_MAX = 128
+        self.curses.keyname.side_effect = _keyname
+        refs = []
+        for name in ('Top', 'Index'):
+            ref = nodes.Reference()
+            ref.filename = 'test/sample.info'
+            ref.nodename = name
+            refs.append(ref)
+        self.session = ui.InfoSession(refs)
+
+    def _run(self, *batches: str):
+        """Run the session on batches of keys, each drawn once at its end."""
+        keys = []
+        for batch in batches:
+            keys.extend(map(ord, batch))
+            keys.append(-1)
+        getch = self.curses.initscr.return_value.getch
+        getch.side_effect = keys + [_Quit()]
+        with self.assertRaises(_Quit):
+            self.session.run()
+
+    def test_one_update_per_frame(self):
+        """Each frame is sent to the terminal once, cursor included."""
+        self._run('jjj', 'j')
+        calls = [c[0] for c in self.curses.mock_calls
+                 if c[0] in ('newpad().noutrefresh', 'setsyx', 'doupdate')]
+        self.assertEqual(calls, ['newpad().noutrefresh', 'setsyx', 'doupdate',
+                                 'setsyx', 'doupdate', 'setsyx', 'doupdate'])
+
+    def test_switch_back(self):
+        """Showing a window again draws all of it over the other one."""
+        noutrefresh = self.curses.newpad.return_value.noutrefresh
+        self._run('1', '0')
+        self.assertIs(self.session.cur_window, self.session.windows[0])
+        # Once at the start, then once for each switch.
+        self.assertEqual(noutrefresh.call_count, 3)
+
+    def test_switch_and_move(self):
+        """A key typed right after switching windows moves the new window."""
+        self._run('1j')
+        first, second = self.session.windows
+        self.assertIs(self.session.cur_window, second)
+        self.assertEqual(second.line_of_point(), 1)
+        self.assertEqual(first.line_of_point(), 0)
+
+    def test_key_actions(self):
+        """Look keys up by the codes getch returns for them."""
+        key_actions = self.session._key_actions
+        self.assertEqual(key_actions[ord('j')], 'next-line')
+        self.assertEqual(key_actions[ord('G')], 'end-of-node')
+        # ^f, which curses names '^F'
+        self.assertEqual(key_actions[6], 'scroll-forward-page-only')
+        self.assertNotIn(ord('z'), key_actions)
+
+    def test_line_ends(self):
+        """Moving by lines stops at the first and last lines."""
+        session = self.session
+        window = session.cur_window
+        session._prev_line()
+        self.assertEqual(window.line_of_point(), 0)
+        for _ in range(window.line_count + 2):
+            session._next_line()
+        self.assertEqual(window.line_of_point(), window.line_count - 1)
+
+    def test_node_links(self):
+        """Follow links within the file and ignore the rest."""
+        session = self.session
+        window = session.cur_window
+        session._prev_node()
+        session._up_node()
+        self.assertEqual(window.node.name, 'Top')
+        session._next_node()
+        self.assertEqual(window.node.name, 'Invoking sample')
+        with mock.patch.object(nodes.Node, 'up', '(other)Top'):
+            session._up_node()
+        self.assertEqual(window.node.name, 'Invoking sample')
+        session._up_node()
+        self.assertEqual(window.node.name, 'Top')
+
+    def test_global_ends(self):
+        """Walking through every node stops at the first and last."""
+        session = self.session
+        window = session.cur_window
+        session._global_prev_node()
+        self.assertEqual(window.node.name, 'Top')
+        for _ in range(5):
+            session._global_next_node()
+        self.assertEqual(window.node.name, 'Index')
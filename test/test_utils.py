@@ -1,6 +1,8 @@
 
 """test_utils.py -- Unit tests for Generic classes"""
 
+import copy
+import pickle
 import unittest
 
 from pin import utils
@@ -31,3 +33,62 @@ class TestDList(unittest.TestCase):
     def test_after(self):
         self.assertEqual(self.data.after('mid'), 1)
 
+    def test_index(self):
+        self.assertEqual(self.data.index('arst'), 2)
+
+    def test_delete(self):
+        cop = utils.DList(self.data)
+        del cop['asdf']
+        self.assertEqual(cop[0], 'dill')
+        self.assertEqual(cop.before('arst'), 'dill')
+        del cop[-1]
+        self.assertEqual(list(cop), ['mid'])
+        self.assertEqual(self.data[0], 15)
+
+    def test_update(self):
+        cop = utils.DList(self.data)
+        cop.update({'mid': 2, 'new': 3})
+        self.assertEqual(cop[-1], 3)
+        self.assertEqual(cop.after('mid'), 1)
+        cop.pop('asdf')
+        self.assertEqual(cop[0], 2)
+
+    def test_copies(self):
+        for cop in (copy.copy(self.data), copy.deepcopy(self.data),
+                    pickle.loads(pickle.dumps(self.data))):
+            self.assertIsInstance(cop, utils.DList)
+            self.assertEqual(list(cop), ['asdf', 'mid', 'arst'])
+            cop['new'] = 3
+            self.assertEqual(cop[-1], 3)
+        self.assertEqual(self.data[-1], 1)
+
+    def test_or(self):
+        cop = self.data | {'new': 3}
+        self.assertIsInstance(cop, utils.DList)
+        self.assertEqual(cop[-1], 3)
+        cop |= {'newer': 4}
+        self.assertEqual(cop[-1], 4)
+        self.assertEqual(cop.before('newer'), 3)
+
+
+class TestLazyList(unittest.TestCase):
+    """Test the list that makes its elements on demand."""
+
+    def setUp(self):
+        self.made = []
+        def factory(source):
+            self.made.append(source)
+            return source * 2
+        self.data = utils.LazyList(factory, [1, 2, 3])
+
+    def test_on_demand(self):
+        self.assertEqual(len(self.data), 3)
+        self.assertEqual(self.made, [])
+        self.assertEqual(self.data[-1], 6)
+        self.assertEqual(self.data[-1], 6)
+        self.assertEqual(self.made, [3])
+
+    def test_iter(self):
+        self.assertEqual(list(self.data), [2, 4, 6])
+        self.assertEqual(self.data[:2], [2, 4])
+        self.assertEqual(self.made, [1, 2, 3])